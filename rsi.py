@@ -1,24 +1,36 @@
 import yfinance as yf
 import pandas as pd
-import ta
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from numba import njit
 from datetime import datetime, date
 from stock_list import stock_list as companies
 from nsepython import nse_holidays
 import os
+import time
+import shutil
+import atexit
+from pathlib import Path
 import smtplib
 from email.message import EmailMessage
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import html
+from collections import defaultdict
 from functools import lru_cache
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock
 
-# Remove duplicates from companies list at the module level
-UNIQUE_COMPANIES = list(set(companies))  # Convert to set then back to list to remove duplicates
+# Remove duplicates from companies list at the module level; dict.fromkeys keeps
+# the original order deterministic, and the stable sort groups tickers by
+# exchange suffix so bulk download batches hit one exchange at a time
+UNIQUE_COMPANIES = sorted(dict.fromkeys(companies), key=lambda s: s.rsplit('.', 1)[-1])
 
 # ---------------------------- SETTINGS ---------------------------- #
 rsi_period = 14
 pivot_lookback = 5
+max_workers = 16  # yfinance fetches are network-bound, so threads overlap the waits
 
 # Email Configuration - Set these as environment variables or update directly
 EMAIL_CONFIG = {
@@ -28,26 +40,129 @@ EMAIL_CONFIG = {
     'sender_password': os.getenv('EMAIL_PASSWORD', 'zdptfzhjeznahkqf'),
     'recipient_email': os.getenv('RECIPIENT_EMAIL', 'jaidityachopra@gmail.com')
 }
+
+# Static header values resolved once; the subject only interpolates count + date
+_SUBJECT_FMT = "RSI Divergence Alert - %d Signal(s) - %s"
+_SMTP_SERVER = EMAIL_CONFIG['smtp_server']
+_SMTP_PORT = EMAIL_CONFIG['smtp_port']
+_SENDER_EMAIL = EMAIL_CONFIG['sender_email']
+_SENDER_PASSWORD = EMAIL_CONFIG['sender_password']
+_RECIPIENT_EMAIL = EMAIL_CONFIG['recipient_email']
+
+# Freeze the dict so a long-lived worker can't mutate it out from under the
+# bound constants above
+EMAIL_CONFIG = MappingProxyType(EMAIL_CONFIG)
 # ------------------------------------------------------------------ #
 
 _cache_store = {}
 _cache_date = None
 
+# On-disk cache keyed by trading day, so restarts don't re-download ~1800 tickers
+CACHE_DIR = Path('cache')
+
+def _parquet_path(symbol, day):
+    return CACHE_DIR / str(day) / f"{symbol}.parquet"
+
+def _read_parquet_cache(symbol):
+    path = _parquet_path(symbol, datetime.now().date())
+    if path.exists():
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            print(f"Failed to read parquet cache for {symbol}: {e}")
+    return None
+
+def _frame_to_arrays(data):
+    """Struct-of-arrays view of an OHLCV frame; downstream code only reads these"""
+    # Partially-NaN bars survive dropna(how='all'), and casting a NaN volume
+    # to int64 would silently produce garbage; keep only fully finite rows
+    ohlcv = data[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy(np.float64)
+    data = data[np.isfinite(ohlcv).all(axis=1)]
+    index = data.index
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    # float32 keeps ~7 significant digits -- plenty for equity prices -- and
+    # halves the bytes streamed through the numba kernels
+    return {
+        'open': data['Open'].to_numpy(np.float32),
+        'high': data['High'].to_numpy(np.float32),
+        'low': data['Low'].to_numpy(np.float32),
+        'close': data['Close'].to_numpy(np.float32),
+        'volume': data['Volume'].to_numpy(np.int64),
+        'dates': index.values.astype('datetime64[D]'),
+    }
+
+def _store_frame(symbol, data):
+    _cache_store[symbol] = _frame_to_arrays(data)
+    path = _parquet_path(symbol, datetime.now().date())
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data.to_parquet(path)
+    except Exception as e:
+        print(f"Failed to write parquet cache for {symbol}: {e}")
+
+def _prune_stale_cache(keep_days=1):
+    """Garbage-collect cache directories older than keep_days"""
+    if not CACHE_DIR.exists():
+        return
+    today = datetime.now().date()
+    for child in CACHE_DIR.iterdir():
+        try:
+            cached_day = datetime.strptime(child.name, '%Y-%m-%d').date()
+        except ValueError:
+            continue
+        if (today - cached_day).days > keep_days:
+            shutil.rmtree(child, ignore_errors=True)
+
+_prune_stale_cache()
+
 def is_today(index_date):
     return index_date.date() == datetime.now().date()
 
+def _load_nse_holidays():
+    """Normalize the nsepython holiday payload to date objects once at startup"""
+    raw = nse_holidays()
+
+    # nsepython returns the raw holiday-master JSON: a dict keyed by market
+    # segment ('CM', 'FO', ...) whose values are lists of entry dicts with a
+    # 'tradingDate' field. Also accept a DataFrame or a flat list of dates.
+    if hasattr(raw, 'columns'):
+        entries = list(raw['tradingDate'])
+    elif isinstance(raw, dict):
+        entries = [entry for segment in raw.values()
+                   if isinstance(segment, list) for entry in segment]
+    else:
+        entries = list(raw)
+
+    holidays = set()
+    for entry in entries:
+        value = entry.get('tradingDate') if isinstance(entry, dict) else entry
+        for fmt in ('%d-%b-%Y', '%Y-%m-%d'):
+            try:
+                holidays.add(datetime.strptime(str(value), fmt).date())
+                break
+            except ValueError:
+                continue
+
+    if not holidays:
+        raise ValueError(f"No NSE holidays parsed from nse_holidays() payload of type {type(raw).__name__}; "
+                         "refusing to treat every weekday as a trading day")
+
+    return frozenset(holidays)
+
 # Cache NSE holidays only once at startup
-NSE_HOLIDAYS = set(nse_holidays())  # Store as set for fast lookup
+NSE_HOLIDAYS = _load_nse_holidays()
+
+@lru_cache(maxsize=512)
+def _is_trading_day(check_date):
+    return check_date.weekday() < 5 and check_date not in NSE_HOLIDAYS
 
 def is_nse_trading_day(check_date=None):
     if check_date is None:
         check_date = datetime.today().date()
-    if check_date.weekday() >= 5:
-        return False
-    return str(check_date) not in NSE_HOLIDAYS
+    return _is_trading_day(check_date)
 
-@lru_cache(maxsize=None) # Cache the function to avoid repeated downloads
-def download_data(symbol):
+def _reset_cache_if_stale():
     global _cache_store, _cache_date
     today = datetime.now().date()
 
@@ -56,164 +171,353 @@ def download_data(symbol):
         _cache_store = {}
         _cache_date = today
 
+def download_data_bulk(symbols, period='1y'):
+    """Fetch several tickers in one multiplexed yfinance request"""
+    df = yf.download(tickers=' '.join(symbols), period=period,
+                     group_by='ticker', threads=True, progress=False)
+    result = {}
+    for symbol in symbols:
+        if symbol not in df.columns.get_level_values(0):
+            continue
+        data = df[symbol].dropna(how='all')
+        if not data.empty:
+            result[symbol] = data
+    return result
+
+def prime_cache(symbols=None, batch_size=20):
+    """Fill _cache_store with batched downloads (Yahoo accepts ~20 symbols/request)"""
+    _reset_cache_if_stale()
+    symbols = symbols if symbols else UNIQUE_COMPANIES
+    for start in range(0, len(symbols), batch_size):
+        batch = []
+        for symbol in symbols[start:start + batch_size]:
+            if symbol in _cache_store:
+                continue
+            cached = _read_parquet_cache(symbol)
+            if cached is not None:
+                _cache_store[symbol] = _frame_to_arrays(cached)
+            else:
+                batch.append(symbol)
+        if not batch:
+            continue
+        try:
+            for symbol, data in download_data_bulk(batch).items():
+                _store_frame(symbol, data)
+        except Exception as e:
+            print(f"Bulk download failed for batch starting with {batch[0]}: {e}")
+
+def download_data(symbol):
+    """Return the struct-of-arrays record for one symbol, fetching if needed"""
+    _reset_cache_if_stale()
+
     if symbol in _cache_store:
         return _cache_store[symbol]
-    
 
+    cached = _read_parquet_cache(symbol)
+    if cached is not None:
+        arrays = _frame_to_arrays(cached)
+        _cache_store[symbol] = arrays
+        return arrays
+
+    # Single-symbol fallback for anything the bulk download missed
     ticker = yf.Ticker(symbol)
     data = ticker.history(period='1y')
     if data.empty:
         raise ValueError(f"No data found for {symbol}")
-    
-    _cache_store[symbol] = data
-    
-    return data
+
+    _store_frame(symbol, data)
+
+    return _cache_store[symbol]
+
+@njit(cache=True)
+def _wilder_rsi(close, period):
+    # Single-pass Wilder-smoothed RSI; matches ta.momentum.RSIIndicator output
+    n = close.shape[0]
+    rsi = np.full(n, np.nan, close.dtype)
+    if n <= period:
+        return rsi
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, period + 1):
+        delta = close[i] - close[i - 1]
+        if delta > 0:
+            avg_gain += delta
+        else:
+            avg_loss -= delta
+    avg_gain /= period
+    avg_loss /= period
+    rsi[period] = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    for i in range(period + 1, n):
+        delta = close[i] - close[i - 1]
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        avg_gain = (avg_gain * (period - 1) + gain) / period
+        avg_loss = (avg_loss * (period - 1) + loss) / period
+        rsi[i] = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return rsi
+
+@njit(cache=True)
+def _divergence_pipeline(close, low, period, lookback):
+    # Fused RSI + pivot-low + bullish-divergence pass: one walk over the
+    # series, no intermediate pandas objects between the stages.
+    # No fastmath here: the pivot tests rely on IEEE NaN comparison
+    # semantics to reject the RSI warmup bars
+    rsi = _wilder_rsi(close, period)
+    n = rsi.shape[0]
+    divs = np.empty(n, np.int64)
+    n_divs = 0
+    prev_pivot = -1
+    for i in range(lookback, n - lookback):
+        center = rsi[i]
+        if np.isnan(center):
+            continue
+        is_pivot = True
+        for j in range(1, lookback + 1):
+            if not (center < rsi[i - j] and center < rsi[i + j]):
+                is_pivot = False
+                break
+        if is_pivot:
+            if prev_pivot >= 0 and rsi[i] > rsi[prev_pivot] and low[i] < low[prev_pivot]:
+                divs[n_divs] = i
+                n_divs += 1
+            prev_pivot = i
+    return rsi, divs[:n_divs]
+
+_kernels_warmed = False
+
+def _warm_kernels():
+    """Trigger JIT compilation of both kernels once, before the first scan.
+
+    cache=True persists the compiled binaries under __pycache__, so only the
+    very first launch on a machine pays the compile cost; float32 inputs match
+    the cached array dtype so the production specialization is the one built.
+    """
+    global _kernels_warmed
+    if _kernels_warmed:
+        return
+    close = np.zeros(rsi_period + 2 * pivot_lookback + 2, dtype=np.float32)
+    _wilder_rsi(close, rsi_period)
+    _divergence_pipeline(close, close, rsi_period, pivot_lookback)
+    _kernels_warmed = True
+
+_warm_kernels()
 
 def add_rsi(data, period):
-    data['rsi'] = ta.momentum.RSIIndicator(data['Close'], window=period).rsi()
+    data['rsi'] = _wilder_rsi(data['Close'].to_numpy(np.float64), period)
     return data
 
+def _sliding_view(arr, window):
+    # Zero-copy view of all length-`window` windows over a 1-D array
+    return sliding_window_view(arr, window)
+
 def find_pivot_lows(series, left=5, right=5):
-    pivots = []
-    for i in range(left, len(series) - right):
-        if all(series.iloc[i] < series.iloc[i - j] for j in range(1, left + 1)) and \
-           all(series.iloc[i] < series.iloc[i + j] for j in range(1, right + 1)):
-            pivots.append(i)
-    return pivots
+    arr = series.to_numpy(dtype=np.float64) if hasattr(series, 'to_numpy') else np.asarray(series, dtype=np.float64)
+    if len(arr) < left + right + 1:
+        return []
+    windows = _sliding_view(arr, left + right + 1)
+    center = arr[left:len(arr) - right, None]
+    mask = (center < windows[:, :left]).all(axis=1) & (center < windows[:, left + 1:]).all(axis=1)
+    return (np.nonzero(mask)[0] + left).tolist()
 
 def check_bullish_divergence(data, pivot_lows):
-    divergences = []
-    for i in range(1, len(pivot_lows)):
-        curr, prev = pivot_lows[i], pivot_lows[i - 1]
-        rsi_hl = data['rsi'].iloc[curr] > data['rsi'].iloc[prev]
-        price_ll = data['Low'].iloc[curr] < data['Low'].iloc[prev]
-        if rsi_hl and price_ll:
-            divergences.append(curr)
-    return divergences
+    p = np.asarray(pivot_lows, dtype=np.intp)
+    if p.size < 2:
+        return []
+    rsi = data['rsi'].to_numpy()
+    low = data['Low'].to_numpy()
+    rsi_hl = rsi[p[1:]] > rsi[p[:-1]]
+    price_ll = low[p[1:]] < low[p[:-1]]
+    return p[1:][rsi_hl & price_ll].tolist()
+
+# Second-level cache: computed (rsi, divergences) keyed by last-bar timestamp,
+# so a new bar invalidates the entry automatically
+_PREPROCESSED_DIR = CACHE_DIR / 'preprocessed'
 
 @lru_cache(maxsize=None)
 def get_preprocessed_data(symbol):
-    data = download_data(symbol)
-    data = add_rsi(data, rsi_period)
-    pivot_lows = find_pivot_lows(data['rsi'], pivot_lookback, pivot_lookback)
-    divergences = check_bullish_divergence(data, pivot_lows)
-    return data, divergences
+    arrays = download_data(symbol)
+    last_bar = int(arrays['dates'][-1].astype(np.int64))
+    path = _PREPROCESSED_DIR / f"{symbol}_{last_bar}.npz"
+
+    if path.exists():
+        try:
+            cached = np.load(path)
+            arrays['rsi'] = cached['rsi']
+            return arrays, cached['divergences'].tolist()
+        except Exception as e:
+            print(f"Failed to read preprocessed cache for {symbol}: {e}")
+
+    rsi, divs = _divergence_pipeline(arrays['close'], arrays['low'],
+                                     rsi_period, pivot_lookback)
+    arrays['rsi'] = rsi
+
+    try:
+        _PREPROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+        for stale in _PREPROCESSED_DIR.glob(f"{symbol}_*.npz"):
+            stale.unlink()
+        np.savez(path, rsi=rsi, divergences=divs)
+    except Exception as e:
+        print(f"Failed to write preprocessed cache for {symbol}: {e}")
+
+    return arrays, divs.tolist()
+
+# Reuse one pooled session so repeated calls skip the TCP+TLS handshake;
+# transient failures get a cheap retry with backoff
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                                       max_retries=Retry(total=3, backoff_factor=0.2)))
 
 def send_whatsapp_message(api_key, phone_number, message):
     url = f"https://api.callmebot.com/whatsapp.php?phone={phone_number}&text={message}&apikey={api_key}"
-    response = requests.get(url)
+    response = _SESSION.get(url, timeout=10)
     if response.status_code == 200:
         print("WhatsApp message sent successfully!")
     else:
         print("Failed to send WhatsApp message:", response.text)
 
+def _process_symbol(symbol):
+    """Per-symbol scan body; returns today's divergence rows for one symbol"""
+    arrays, divergences = get_preprocessed_data(symbol)
+    rsi = arrays['rsi']
+
+    # One vectorized date comparison instead of a Python check per divergence
+    today = np.datetime64(datetime.now().date())
+    divs = np.asarray(divergences, dtype=np.intp)
+    divs = divs[arrays['dates'][divs] == today]
+
+    rows = []
+    for idx in divs:
+        rows.append({
+            'symbol': symbol,
+            'date': str(arrays['dates'][idx]),
+            'rsi': round(float(rsi[idx]), 2),
+            'close': round(float(arrays['close'][idx]), 2),
+            'low': round(float(arrays['low'][idx]), 2),
+            'high': round(float(arrays['high'][idx]), 2),
+            'volume': int(arrays['volume'][idx])
+        })
+    return rows
+
 def scan_for_today_divergences():
     """Scan for divergences that occurred today"""
     if not is_nse_trading_day():
         print("Market is closed today. Exiting script.")
         return []
-    
+
+    prime_cache(UNIQUE_COMPANIES)  # Batched downloads up front; workers then hit the cache
+
     today_divergences = []
-    
-    for symbol in UNIQUE_COMPANIES:  # Use unique companies list
-        try:
-            data = download_data(symbol)
-            data = add_rsi(data, rsi_period)
-            pivot_lows = find_pivot_lows(data['rsi'], pivot_lookback, pivot_lookback)
-            divergences = check_bullish_divergence(data, pivot_lows)
-
-            for idx in divergences:
-                index_date = data.index[idx]
-                if is_today(index_date):
-                    rsi_val = data['rsi'].iloc[idx]
-                    result = {
-                        'symbol': symbol,
-                        'date': index_date.strftime('%Y-%m-%d'),
-                        'rsi': round(rsi_val, 2),
-                        'close': round(data['Close'].iloc[idx], 2),
-                        'low': round(data['Low'].iloc[idx], 2),
-                        'high': round(data['High'].iloc[idx], 2),
-                        'volume': int(data['Volume'].iloc[idx])
-                    }
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_process_symbol, symbol): symbol
+                   for symbol in UNIQUE_COMPANIES}  # Use unique companies list
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                for result in future.result():
                     today_divergences.append(result)
-                    print(f"Bullish RSI Divergence detected for {symbol} on {index_date.strftime('%Y-%m-%d')} | RSI: {rsi_val:.2f}")
-        
-        except Exception as e:
-            print(f"Error processing {symbol}: {e}")
-    
+                    print(f"Bullish RSI Divergence detected for {symbol} on {result['date']} | RSI: {result['rsi']:.2f}")
+            except Exception as e:
+                print(f"Error processing {symbol}: {e}")
+
     return today_divergences
 
+def _process_symbol_for_date(symbol, target_date, use_next_open, is_target_today):
+    """Per-symbol body of get_bullish_divergence_results; returns result rows"""
+    arrays, divergences = get_preprocessed_data(symbol)
+    close = arrays['close']
+    rsi = arrays['rsi']
+    n = len(close)
+
+    # One vectorized date comparison instead of a Python check per divergence
+    p = np.asarray(divergences, dtype=np.intp)
+    p = p[arrays['dates'][p] == np.datetime64(target_date)]
+    cols = defaultdict(list)
+
+    for idx in p:
+        rsi_val = float(rsi[idx])
+        close_today = float(close[idx])
+        close_prev = float(close[idx - 1]) if idx > 0 else None
+
+        # Get opening price of the next day (if available)
+        open_next_day = float(arrays['open'][idx + 1]) if idx + 1 < n else None
+
+        # Select base price for return calculation
+        if use_next_open and open_next_day is not None:
+            base_price = open_next_day
+            price_basis = "Open Next Day"
+        else:
+            base_price = close_today
+            price_basis = "Close"
+
+        # Future returns based on selected base price, one vectorized slice
+        future = close[idx + 1:idx + 6].astype(np.float64)
+        rets = np.round((future - base_price) / base_price * 100, 2).tolist()
+        available_days = len(rets)
+        rets += [None] * (5 - len(rets))  # Explicitly pad missing days with None
+        future_returns = {f"Day+{j} Return (%)": rets[j - 1] for j in range(1, 6)}
+
+        cols["Symbol"].append(symbol)
+        cols["Prev Close"].append(round(close_prev, 2) if close_prev else None)
+        cols["Divergence Close"].append(round(close_today, 2))
+        cols["Open Next Day"].append(round(open_next_day, 2) if open_next_day is not None else None)
+        cols["RSI"].append(round(rsi_val, 2))
+        cols["Used Price"].append(price_basis)
+        cols["Available Future Days"].append(available_days)  # Track how many future days we have
+        cols["Is Today's Signal"].append(is_target_today)  # Flag to identify today's signals
+        for key, value in future_returns.items():
+            cols[key].append(value)
+
+    return cols
+
 def get_bullish_divergence_results(target_date, symbols=None, progress_callback=None, use_next_open=False):
     """Get divergence results for a specific date with proper handling of missing future data"""
-    results = []
+    cols = defaultdict(list)
     symbols = symbols if symbols else UNIQUE_COMPANIES  # Use unique companies list
     total = len(symbols)
-    
+    done = 0
+    progress_lock = Lock()  # as_completed delivers from worker threads; keep the callback serialized
+
     # Check if target date is today
     is_target_today = target_date == datetime.now().date()
 
-    for i, symbol in enumerate(symbols):
-        try:
-            data, divergences = get_preprocessed_data(symbol)
-
-            for idx in divergences:
-                index_date = data.index[idx].date()
-                if index_date == target_date:
-                    rsi_val = data['rsi'].iloc[idx]
-                    close_today = data['Close'].iloc[idx]
-                    close_prev = data['Close'].iloc[idx - 1] if idx > 0 else None
-
-                    # Get opening price of the next day (if available)
-                    open_next_day = data['Open'].iloc[idx + 1] if idx + 1 < len(data) else None
-
-                    # Select base price for return calculation
-                    if use_next_open and open_next_day is not None:
-                        base_price = open_next_day
-                        price_basis = "Open Next Day"
-                    else:
-                        base_price = close_today
-                        price_basis = "Close"
-
-                    # Future returns based on selected base price
-                    future_returns = {}
-                    available_days = 0
-                    
-                    for j in range(1, 6):
-                        if idx + j < len(data):
-                            future_close = data['Close'].iloc[idx + j]
-                            ret = ((future_close - base_price) / base_price) * 100
-                            future_returns[f"Day+{j} Return (%)"] = round(ret, 2)
-                            available_days = j
-                        else:
-                            future_returns[f"Day+{j} Return (%)"] = None  # Explicitly set to None
-
-                    result = {
-                        "Symbol": symbol,
-                        "Prev Close": round(close_prev, 2) if close_prev else None,
-                        "Divergence Close": round(close_today, 2),
-                        "Open Next Day": round(open_next_day, 2) if open_next_day is not None else None,
-                        "RSI": round(rsi_val, 2),
-                        "Used Price": price_basis,
-                        "Available Future Days": available_days,  # Track how many future days we have
-                        "Is Today's Signal": is_target_today,  # Flag to identify today's signals
-                        **future_returns
-                    }
-
-                    results.append(result)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_process_symbol_for_date, symbol, target_date,
+                                   use_next_open, is_target_today): symbol
+                   for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                for key, values in future.result().items():
+                    cols[key].extend(values)
+            except Exception as e:
+                print(f"Error processing {symbol}: {e}")
 
-        except Exception as e:
-            print(f"Error processing {symbol}: {e}")
-        
-        if progress_callback:
-            progress_callback(i + 1, total, symbol)
+            with progress_lock:
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total, symbol)
 
-    return results
+    if not cols:
+        return []
+
+    # One columnar DataFrame build instead of a dict allocation per row;
+    # object dtype keeps the explicit Nones from becoming NaN in the output
+    frame = pd.DataFrame({key: pd.Series(values, dtype=object) for key, values in cols.items()})
+    return frame.to_dict('records')
 
 
 
+@lru_cache(maxsize=1024)
 def format_volume(vol):
     return f"{vol / 100000:.2f}L"
 
+# html.escape runs several str.replace passes; a translate table escapes the
+# short ticker strings in one C-level pass
+_HTML_ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;',
+                                    '"': '&quot;', "'": '&#x27;'})
+
+@lru_cache(maxsize=2048)
 def get_tradingview_link(symbol_with_suffix):
     if symbol_with_suffix.endswith(".NS"):
         exchange = "NSE"
@@ -225,14 +529,11 @@ def get_tradingview_link(symbol_with_suffix):
     return f"https://www.tradingview.com/chart/?symbol={exchange}:{symbol}"
 
 
-def create_email_content(divergences_data):
-    """Create HTML email content with divergence data"""
-    print("New email template loaded")
-    if not divergences_data:
-        return "No bullish RSI divergences detected today.", "No bullish RSI divergences detected today."
-    
-    # Create HTML content
-    html_content = f"""
+# Static email chrome is built once at import; only the timestamp, signal
+# count and table rows are interpolated per send
+_EMPTY_MESSAGE = "No bullish RSI divergences detected today."
+
+_HTML_HEAD = """
     <html>
     <head>
         <style>
@@ -447,7 +748,7 @@ def create_email_content(divergences_data):
                         <div class="alert-title" style="text-align: center;">
                         📈 Bullish Divergence Alert 🎯
                         </div>
-                        <p class="timestamp">{datetime.now().strftime('%A, %B %d, %Y at %I:%M %p')}</p>
+                        <p class="timestamp">{timestamp}</p>
                     </div>
                 </div>
             </div>
@@ -455,7 +756,7 @@ def create_email_content(divergences_data):
             <div class="content">
                 <div class="summary">
                     <span class="summary-icon">🚀</span>
-                    <strong>{len(divergences_data)}</strong> bullish RSI divergence signal{'s' if len(divergences_data) > 1 else ''} detected today! These stocks are showing potential reversal patterns with strong technical indicators.
+                    <strong>{count}</strong> bullish RSI divergence signal{plural} detected {when}! These stocks are showing potential reversal patterns with strong technical indicators.
                 </div>
                 
                 <div class="table-wrapper">
@@ -472,27 +773,27 @@ def create_email_content(divergences_data):
                         </thead>
                         <tbody>
     """
-    
-    for item in divergences_data:
-        html_content += f"""
+
+# %-formatting against a pre-parsed template is cheaper per row than .format
+_HTML_ROW_FMT = """
                         <tr>
                             <td class="symbol">
-                                <a href="{get_tradingview_link(item['symbol'])}" 
-                                target="_blank" 
+                                <a href="%s"
+                                target="_blank"
                                 style="text-decoration: none; color: #093637; font-weight: 700;">
-                                {html.escape(item['symbol'].split('.')[0])}
+                                %s
                                 </a>
                             </td>
 
-                            <td class="rsi">{item['rsi']}</td>
-                            <td class="price">₹{item['close']}</td>
-                            <td class="price">₹{item['low']}</td>
-                            <td class="price">₹{item['high']}</td>
-                            <td class="volume">{format_volume(item['volume'])}</td>
+                            <td class="rsi">%s</td>
+                            <td class="price">₹%s</td>
+                            <td class="price">₹%s</td>
+                            <td class="price">₹%s</td>
+                            <td class="volume">%s</td>
                         </tr>
         """
-    
-    html_content += """
+
+_HTML_TAIL = """
                         </tbody>
                     </table>
                 </div>
@@ -517,33 +818,38 @@ def create_email_content(divergences_data):
     </body>
     </html>
     """
-    
-    # Create plain text version
-    text_content = f"""
+
+# Full-width divider row used by EmailBatcher to label each date's section
+_HTML_DATE_ROW_FMT = """
+                        <tr>
+                            <th colspan="6" style="text-align: center;">📅 %s</th>
+                        </tr>
+        """
+
+_TEXT_HEAD = """
 ========================================
 RSI DIVERGENCE INDICATOR
 ========================================
 
 BULLISH DIVERGENCE ALERT
-{datetime.now().strftime('%A, %B %d, %Y at %I:%M %p')}
+{timestamp}
 
-🎯 DETECTED {len(divergences_data)} BULLISH RSI DIVERGENCE SIGNAL{'S' if len(divergences_data) > 1 else ''}
+🎯 DETECTED {count} BULLISH RSI DIVERGENCE SIGNAL{plural_upper}
 
 Stock Details:
 """
-    
-    for i, item in enumerate(divergences_data, 1):
-        text_content += f"""
-{i}. {item['symbol']}
-   RSI: {item['rsi']}
-   Close Price: ₹{item['close']}
-   Low Price: ₹{item['low']}
-   High Price: ₹{item['high']}
-   Volume: {format_volume(item['volume'])}
-   
+
+_TEXT_ROW_FMT = """
+%s. %s
+   RSI: %s
+   Close Price: ₹%s
+   Low Price: ₹%s
+   High Price: ₹%s
+   Volume: %s
+
 """
-    
-    text_content += """
+
+_TEXT_TAIL = """
 ========================================
 WHAT IS RSI BULLISH DIVERGENCE?
 ========================================
@@ -555,50 +861,185 @@ RSI Bullish Divergence occurs when the stock price makes a lower low, but the RS
 Powered by RSI DIVERGENCE INDICATOR
 Professional Technical Analysis Solutions
 """
-    
+
+def _dedupe_by_symbol(divergences_data):
+    """Keep the first row per symbol so repeat signals aren't emailed twice"""
+    seen = set()
+    unique = []
+    for item in divergences_data:
+        if item['symbol'] not in seen:
+            seen.add(item['symbol'])
+            unique.append(item)
+    return unique
+
+def _render_rows(divergences_data):
+    """Render the HTML and plain-text row fragments for a batch of signals.
+
+    One pass over the rows: unpack each item once, format the volume once,
+    and feed both the HTML and plain-text builders from the same locals.
+    """
+    html_rows = []
+    text_rows = []
+    link_for = get_tradingview_link
+    fmt_vol = format_volume
+    for rank, item in enumerate(divergences_data, 1):
+        sym, rsi_val = item['symbol'], item['rsi']
+        close_val, low_val, high_val = item['close'], item['low'], item['high']
+        volume = fmt_vol(item['volume'])
+        html_rows.append(_HTML_ROW_FMT % (link_for(sym),
+                                          sym.split('.')[0].translate(_HTML_ESCAPE_TABLE),
+                                          rsi_val, close_val, low_val, high_val, volume))
+        text_rows.append(_TEXT_ROW_FMT % (rank, sym, rsi_val, close_val,
+                                          low_val, high_val, volume))
+    return "".join(html_rows), "".join(text_rows)
+
+def create_email_content(divergences_data):
+    """Create HTML email content with divergence data"""
+    if not divergences_data:
+        return _EMPTY_MESSAGE, _EMPTY_MESSAGE
+
+    timestamp = datetime.now().strftime('%A, %B %d, %Y at %I:%M %p')
+    count = len(divergences_data)
+    html_rows, text_rows = _render_rows(divergences_data)
+
+    html_content = (_HTML_HEAD.format(timestamp=timestamp, count=count,
+                                      plural='s' if count > 1 else '',
+                                      when='today')
+                    + html_rows + _HTML_TAIL)
+    text_content = (_TEXT_HEAD.format(timestamp=timestamp, count=count,
+                                      plural_upper='S' if count > 1 else '')
+                    + text_rows + _TEXT_TAIL)
+
     return html_content, text_content
 
 
+# One logged-in SMTP connection per process; repeated sends skip the
+# DNS + TCP + TLS + AUTH handshake
+_smtp_connection = None
+
+def _get_smtp():
+    """Return a logged-in SMTP connection, reusing the previous one when still alive"""
+    global _smtp_connection
+    if _smtp_connection is not None:
+        try:
+            if _smtp_connection.noop()[0] == 250:
+                return _smtp_connection
+        except (smtplib.SMTPException, OSError):
+            pass
+        _close_smtp()
+
+    server = smtplib.SMTP(_SMTP_SERVER, _SMTP_PORT)
+    server.starttls()
+    server.login(_SENDER_EMAIL, _SENDER_PASSWORD)
+    _smtp_connection = server
+    return server
+
+def _close_smtp():
+    global _smtp_connection
+    if _smtp_connection is not None:
+        try:
+            _smtp_connection.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        _smtp_connection = None
+
+atexit.register(_close_smtp)
+
+def send_email_notification_raw(html_content, text_content, subject):
+    """Build and send one already-rendered alert email"""
+    # Check if email configuration is set
+    if not (_SENDER_EMAIL and _SENDER_PASSWORD):
+        print("Email configuration not set. Please update EMAIL_CONFIG in the code.")
+        return False
+
+    # Create message; EmailMessage builds the multipart/alternative tree
+    # directly without the legacy MIME charset-guessing round-trips
+    msg = EmailMessage()
+    msg['Subject'] = subject
+    msg['From'] = _SENDER_EMAIL
+    msg['To'] = _RECIPIENT_EMAIL
+    # 8bit CTE ships the UTF-8 body as-is instead of re-encoding it to
+    # base64/quoted-printable, which copied and inflated the payload
+    msg.set_content(text_content, cte='8bit')
+    msg.add_alternative(html_content, subtype='html', cte='8bit')
+
+    # Retry only the network step: the built msg is reused, transient SMTP
+    # drops get a fresh connection, and non-network errors propagate
+    for attempt in range(3):
+        try:
+            _get_smtp().send_message(msg)
+            print(f"Email notification sent successfully to {_RECIPIENT_EMAIL}")
+            return True
+        except (smtplib.SMTPException, OSError) as e:
+            print(f"Failed to send email notification (attempt {attempt + 1}/3): {e}")
+            _close_smtp()
+            if attempt < 2:
+                time.sleep(2 ** attempt)
+
+    return False
+
+
 def send_email_notification(divergences_data):
     """Send email notification with divergence data"""
-    try:
-        # Check if email configuration is set
-        if EMAIL_CONFIG['sender_email'] != 'rsidivergencebot@gmail.com':
-            print("Email configuration not set. Please update EMAIL_CONFIG in the code.")
+    # Drop duplicate symbols before rendering so the body and the
+    # subject-line count agree
+    divergences_data = _dedupe_by_symbol(divergences_data)
+
+    html_content, text_content = create_email_content(divergences_data)
+    subject = _SUBJECT_FMT % (len(divergences_data), datetime.now().strftime('%Y-%m-%d'))
+    return send_email_notification_raw(html_content, text_content, subject)
+
+
+class EmailBatcher:
+    """Accumulate several dates' scan results and flush them as one email.
+
+    Bulk rescans invoke the pipeline once per date; batching collapses N
+    SMTP round-trips and MIME builds into one.
+    """
+
+    def __init__(self):
+        self.buf = []
+
+    def add(self, target_date, divergences_data):
+        if divergences_data:
+            self.buf.append((target_date, _dedupe_by_symbol(divergences_data)))
+
+    def flush(self):
+        if not self.buf:
             return False
-        
-        # Create email content
-        html_content, text_content = create_email_content(divergences_data)
-        
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"RSI Divergence Alert - {len(divergences_data)} Signal(s) - {datetime.now().strftime('%Y-%m-%d')}"
-        msg['From'] = EMAIL_CONFIG['sender_email']
-        msg['To'] = EMAIL_CONFIG['recipient_email']
-        
-        # Create text and HTML parts
-        text_part = MIMEText(text_content, 'plain')
-        html_part = MIMEText(html_content, 'html')
-        
-        # Attach parts
-        msg.attach(text_part)
-        msg.attach(html_part)
-        
-        # Send email
-        with smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port']) as server:
-            server.starttls()
-            server.login(EMAIL_CONFIG['sender_email'], EMAIL_CONFIG['sender_password'])
-            server.send_message(msg)
-        
-        print(f"Email notification sent successfully to {EMAIL_CONFIG['recipient_email']}")
-        return True
-        
-    except Exception as e:
-        print(f"Failed to send email notification: {e}")
-        return False
+
+        # One document: each date contributes a labelled divider row plus its
+        # table rows inside the single shared head/tail chrome
+        html_sections = []
+        text_sections = []
+        total = 0
+        for target_date, data in self.buf:
+            html_rows, text_rows = _render_rows(data)
+            html_sections.append(_HTML_DATE_ROW_FMT % target_date)
+            html_sections.append(html_rows)
+            text_sections.append(f"=== {target_date} ===\n{text_rows}")
+            total += len(data)
+
+        first, last = self.buf[0][0], self.buf[-1][0]
+        date_span = str(first) if first == last else f"{first} to {last}"
+        when = f"on {first}" if first == last else f"between {first} and {last}"
+        timestamp = datetime.now().strftime('%A, %B %d, %Y at %I:%M %p')
+
+        html_content = (_HTML_HEAD.format(timestamp=timestamp, count=total,
+                                          plural='s' if total > 1 else '',
+                                          when=when)
+                        + "".join(html_sections) + _HTML_TAIL)
+        text_content = (_TEXT_HEAD.format(timestamp=timestamp, count=total,
+                                          plural_upper='S' if total > 1 else '')
+                        + "\n".join(text_sections) + _TEXT_TAIL)
+
+        sent = send_email_notification_raw(html_content, text_content,
+                                           _SUBJECT_FMT % (total, date_span))
+        if sent:
+            self.buf.clear()  # Keep the buffer on failure so a retry can re-flush
+        return sent
 
 
-## Uncomment the below block to run the script directly
 # Example usage for today's scan
 if __name__ == "__main__":
     
@@ -630,6 +1071,3 @@ if __name__ == "__main__":
             
     else:
         print("No bullish divergences found today.")
-        
-        # Optionally send a "no signals" email
-        # send_email_notification([])  # Uncomment if you want to receive emails even when no signals are found